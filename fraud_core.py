@@ -0,0 +1,850 @@
+"""Shared fraud-detection core: database access, ledger hashing and gates.
+
+Imported by both the Flask app (app.py) and the CLI entry point
+(fraud-dection.py) so the two stay on one implementation.
+"""
+
+from contextlib import contextmanager
+from functools import lru_cache
+import hashlib
+import openpyxl
+from datetime import date, datetime
+import sqlite3
+import threading
+import time
+import queue
+import os
+
+
+# ==============================
+# GLOBAL CONFIG
+# ==============================
+
+INITIAL_BUDGET = 1000000
+DB_FILE = "fraud_system.db"
+LEDGER_FILE = "ledger.txt"
+REGISTRY_FILE = "jan_dhan_registry_advanced.xlsx"
+POOL_SIZE = 5
+SCHEME_AMOUNT_MAP = {
+    "Health_Scheme": 5000.0,
+    "Education_Scheme": 10000.0,
+    "Agriculture_Scheme": 15000.0,
+    "Housing_Scheme": 20000.0,
+}
+AMOUNT_TOLERANCE = 0.01
+
+
+# ==============================
+# DATABASE HELPERS
+# ==============================
+
+_CONNECTION_POOL = queue.Queue(maxsize=POOL_SIZE)
+
+# Shared SQL text so pooled connections hit sqlite's statement cache instead
+# of re-parsing per call.
+SQL_INSERT_LEDGER = """
+    INSERT INTO ledger_entries (timestamp, citizen_hash, scheme, amount, previous_hash, current_hash)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+SQL_SELECT_PREV_HASH = "SELECT current_hash FROM ledger_entries ORDER BY timestamp DESC, id DESC LIMIT 1"
+SQL_SELECT_LEDGER_ROWS_DESC = (
+    "SELECT timestamp, citizen_hash, scheme, amount, previous_hash, current_hash "
+    "FROM ledger_entries ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+)
+SQL_SELECT_CITIZEN = "SELECT * FROM citizens WHERE citizen_id = ?"
+SQL_UPDATE_CITIZEN_CLAIM = (
+    "UPDATE citizens SET claim_count = claim_count + 1, last_claim_date = ? "
+    "WHERE citizen_id = ?"
+)
+SQL_SELECT_TOTAL_DISBURSED = "SELECT value FROM meta WHERE key = 'total_disbursed'"
+SQL_UPDATE_TOTAL_DISBURSED = "UPDATE meta SET value = value + ? WHERE key = 'total_disbursed'"
+SQL_SELECT_STATUS = "SELECT value FROM meta WHERE key = 'status'"
+SQL_UPDATE_STATUS = "UPDATE meta SET value = ? WHERE key = 'status'"
+SQL_SELECT_LAST_VERIFIED_ID = "SELECT value FROM meta WHERE key = 'last_verified_id'"
+SQL_UPDATE_LAST_VERIFIED_ID = "UPDATE meta SET value = ? WHERE key = 'last_verified_id'"
+SQL_SELECT_LAST_VERIFIED_HASH = "SELECT value FROM meta WHERE key = 'last_verified_hash'"
+SQL_UPDATE_LAST_VERIFIED_HASH = "UPDATE meta SET value = ? WHERE key = 'last_verified_hash'"
+SQL_SELECT_UNVERIFIED_ROWS = (
+    "SELECT id, timestamp, citizen_hash, scheme, amount, previous_hash, current_hash "
+    "FROM ledger_entries WHERE id > ? ORDER BY id"
+)
+
+
+def _open_connection():
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False, cached_statements=512)
+    conn.row_factory = sqlite3.Row
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-64000")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA busy_timeout=30000")
+    cursor.execute("PRAGMA wal_autocheckpoint=1000")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+@contextmanager
+def borrow_connection():
+    try:
+        conn = _CONNECTION_POOL.get_nowait()
+    except queue.Empty:
+        conn = _open_connection()
+    try:
+        yield conn
+    finally:
+        # Connections are long-lived now; never return one to the pool with
+        # a transaction still open or the next borrower inherits it.
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            _CONNECTION_POOL.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+
+def init_db():
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ledger_entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                citizen_hash TEXT NOT NULL,
+                scheme TEXT NOT NULL,
+                amount REAL NOT NULL,
+                previous_hash TEXT NOT NULL,
+                current_hash TEXT NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS citizens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                citizen_id TEXT UNIQUE NOT NULL,
+                name TEXT NOT NULL,
+                account_status TEXT NOT NULL,
+                aadhaar_linked INTEGER NOT NULL,
+                scheme_eligibility TEXT NOT NULL,
+                scheme_amount REAL NOT NULL,
+                claim_count INTEGER NOT NULL,
+                last_claim_date TEXT NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS merkle_nodes (
+                level INTEGER PRIMARY KEY,
+                node_hash TEXT NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value REAL NOT NULL
+            )
+            """
+        )
+        cursor.execute(
+            """
+            INSERT OR IGNORE INTO meta (key, value)
+            SELECT 'total_disbursed', COALESCE(SUM(amount), 0) FROM ledger_entries
+            """
+        )
+        cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('status', 'ACTIVE')")
+        cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('last_verified_id', 0)")
+        cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('last_verified_hash', 'GENESIS')")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ledger_citizen_hash ON ledger_entries(citizen_hash)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ledger_ts_id ON ledger_entries(timestamp DESC, id DESC)"
+        )
+        conn.commit()
+    backfill_ledger_from_file()
+    backfill_citizens_from_excel()
+    _sync_merkle_nodes()
+
+
+def backfill_ledger_from_file():
+    if not os.path.exists(LEDGER_FILE):
+        return
+
+    with open(LEDGER_FILE, "r") as f:
+        lines = [line.strip() for line in f.readlines() if line.strip()]
+
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT current_hash FROM ledger_entries")
+        known_hashes = {row[0] for row in cursor.fetchall()}
+
+        rows = []
+        for line in lines:
+            parts = line.split("|")
+            if len(parts) != 6:
+                continue
+            timestamp, citizen_hash, scheme, amount_str, previous_hash, current_hash = parts
+            if current_hash in known_hashes:
+                continue
+            known_hashes.add(current_hash)
+            try:
+                amount_value = float(amount_str)
+            except ValueError:
+                amount_value = 0.0
+            rows.append((timestamp, citizen_hash, scheme, amount_value, previous_hash, current_hash))
+
+        if rows:
+            cursor.executemany(SQL_INSERT_LEDGER, rows)
+            cursor.execute(
+                SQL_UPDATE_TOTAL_DISBURSED,
+                (sum(row[3] for row in rows),)
+            )
+            conn.commit()
+
+
+def backfill_citizens_from_excel():
+    if not os.path.exists(REGISTRY_FILE):
+        return
+
+    required_cols = ["Citizen_ID", "Name", "Account_Status", "Aadhaar_Linked", "Scheme_Eligibility",
+                     "Scheme_Amount", "Claim_Count", "Last_Claim_Date"]
+    try:
+        workbook = openpyxl.load_workbook(REGISTRY_FILE, read_only=True, data_only=True)
+    except Exception:
+        return
+
+    try:
+        sheet_rows = workbook.active.iter_rows(values_only=True)
+        header = next(sheet_rows, None)
+        if header is None or not set(required_cols).issubset(set(header)):
+            return
+        idx = {name: header.index(name) for name in required_cols}
+
+        rows = []
+        for raw in sheet_rows:
+            if raw[idx["Citizen_ID"]] is None:
+                continue
+            last_claim = raw[idx["Last_Claim_Date"]]
+            if isinstance(last_claim, datetime):
+                last_claim = last_claim.strftime("%Y-%m-%d")
+            else:
+                # Text cells may carry unpadded dates ("2025-1-5"); parse
+                # and re-format so the stored value keeps the fixed-width
+                # YYYY-MM-DD layout the frequency gate slices.
+                try:
+                    last_claim = datetime.strptime(
+                        str(last_claim)[:10], "%Y-%m-%d"
+                    ).strftime("%Y-%m-%d")
+                except ValueError:
+                    last_claim = str(last_claim)[:10]
+            rows.append((
+                str(raw[idx["Citizen_ID"]]),
+                raw[idx["Name"]],
+                raw[idx["Account_Status"]],
+                1 if raw[idx["Aadhaar_Linked"]] else 0,
+                raw[idx["Scheme_Eligibility"]],
+                float(raw[idx["Scheme_Amount"]] or 0),
+                int(raw[idx["Claim_Count"]] or 0),
+                last_claim,
+            ))
+    finally:
+        workbook.close()
+
+    if not rows:
+        return
+
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            """
+            INSERT OR REPLACE INTO citizens
+            (citizen_id, name, account_status, aadhaar_linked, scheme_eligibility, scheme_amount, claim_count, last_claim_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows
+        )
+        conn.commit()
+    _invalidate_citizen_cache()
+
+
+# ==============================
+# LEDGER HELPERS
+# ==============================
+
+@lru_cache(maxsize=8192)
+def hash_id_digest(citizen_id):
+    return hashlib.sha256(citizen_id.encode()).digest()
+
+
+def hash_id(citizen_id):
+    return hash_id_digest(citizen_id).hex()
+
+
+def amount_hash_value(amount):
+    try:
+        amount_float = float(amount)
+        if amount_float.is_integer():
+            return str(int(amount_float))
+        return str(amount_float)
+    except (TypeError, ValueError):
+        return str(amount)
+
+
+# Formatted timestamps for the current second; every transaction in the
+# same wall-second shares one strftime (the chain orders entries through
+# previous_hash, not the timestamp).
+_TS_CACHE = [0, "", ""]
+
+
+def now_strings():
+    second = int(time.time())
+    if second != _TS_CACHE[0]:
+        now = datetime.fromtimestamp(second)
+        _TS_CACHE[:] = [second, now.strftime("%Y-%m-%d %H:%M:%S"), now.strftime("%Y-%m-%d")]
+    return _TS_CACHE[1], _TS_CACHE[2]
+
+
+def generate_hash(timestamp, citizen_hash, scheme, amount, previous_hash):
+    # Feed the fields straight into the OpenSSL-backed hasher instead of
+    # building an intermediate f-string and encoding it.
+    h = hashlib.sha256()
+    h.update(timestamp.encode())
+    h.update(citizen_hash.encode())
+    h.update(scheme.encode())
+    h.update(str(amount).encode())
+    h.update(previous_hash.encode())
+    return h.hexdigest()
+
+
+def get_previous_hash():
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_SELECT_PREV_HASH)
+        row = cursor.fetchone()
+    if not row:
+        return "GENESIS"
+    return row[0]
+
+
+def fetch_ledger_rows_desc(limit=None, offset=0):
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_SELECT_LEDGER_ROWS_DESC, (-1 if limit is None else limit, offset))
+        rows = cursor.fetchall()
+    return rows
+
+
+# ==============================
+# MERKLE TREE HELPERS
+# ==============================
+
+def _merkle_leaf_hash(current_hash):
+    return hashlib.sha256(b"\x00" + current_hash.encode()).hexdigest()
+
+
+def _merkle_branch_hash(left, right):
+    return hashlib.sha256(b"\x01" + left.encode() + right.encode()).hexdigest()
+
+
+def _load_merkle_nodes(cursor):
+    cursor.execute("SELECT level, node_hash FROM merkle_nodes")
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def _store_merkle_nodes(cursor, nodes):
+    cursor.execute("DELETE FROM merkle_nodes")
+    cursor.executemany(
+        "INSERT INTO merkle_nodes (level, node_hash) VALUES (?, ?)",
+        list(nodes.items())
+    )
+
+
+def _fold_merkle_root(nodes):
+    if not nodes:
+        return "GENESIS"
+    root = None
+    for level in sorted(nodes):
+        root = nodes[level] if root is None else _merkle_branch_hash(nodes[level], root)
+    return root
+
+
+def _merkle_insert_leaf(nodes, current_hash):
+    node_hash = _merkle_leaf_hash(current_hash)
+    level = 0
+    while level in nodes:
+        node_hash = _merkle_branch_hash(nodes.pop(level), node_hash)
+        level += 1
+    nodes[level] = node_hash
+    return nodes
+
+
+def _merkle_append(cursor, current_hash):
+    # An append only collapses the pending nodes below the first free
+    # level, so touch just those rows instead of rewriting the table.
+    nodes = _load_merkle_nodes(cursor)
+    node_hash = _merkle_leaf_hash(current_hash)
+    level = 0
+    while level in nodes:
+        node_hash = _merkle_branch_hash(nodes[level], node_hash)
+        cursor.execute("DELETE FROM merkle_nodes WHERE level = ?", (level,))
+        level += 1
+    cursor.execute(
+        "INSERT INTO merkle_nodes (level, node_hash) VALUES (?, ?)",
+        (level, node_hash)
+    )
+
+
+def _rebuild_merkle_nodes(cursor, leaf_hashes):
+    nodes = {}
+    for leaf in leaf_hashes:
+        _merkle_insert_leaf(nodes, leaf)
+    _store_merkle_nodes(cursor, nodes)
+    return nodes
+
+
+def _sync_merkle_nodes():
+    # The pending nodes encode the leaf count as a sum of powers of two,
+    # so a tree that fell out of sync with the ledger (file imports, or a
+    # database created before the tree existed) is detected by a count
+    # mismatch and rebuilt. Runs on every startup, whether or not a
+    # legacy ledger file was around to import.
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM ledger_entries")
+        entry_count = cursor.fetchone()[0]
+        cursor.execute("SELECT level FROM merkle_nodes")
+        leaf_count = sum(2 ** row[0] for row in cursor.fetchall())
+        if leaf_count != entry_count:
+            cursor.execute("SELECT current_hash FROM ledger_entries ORDER BY id")
+            _rebuild_merkle_nodes(cursor, [row[0] for row in cursor.fetchall()])
+            conn.commit()
+
+
+def full_ledger_audit():
+    # Cold path: re-hash the whole chain from GENESIS, ignoring the
+    # high-water mark, and reset the mark to the audited tail on success.
+    # Attribute lookups are hoisted out of the loop; the compression itself
+    # already runs in OpenSSL's C (SHA-NI) code via hashlib.
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        # Read the chain and the stored tree from one BEGIN-held snapshot;
+        # read on separate connections, a transaction committed mid-audit
+        # would add a leaf the audited chain lacks and the root check
+        # below would report tampering on a healthy ledger.
+        cursor.execute("BEGIN")
+        try:
+            cursor.execute(SQL_SELECT_UNVERIFIED_ROWS, (0,))
+            rows = cursor.fetchall()
+            stored_nodes = _load_merkle_nodes(cursor)
+        finally:
+            conn.rollback()
+
+    sha256 = hashlib.sha256
+    format_amount = amount_hash_value
+    insert_leaf = _merkle_insert_leaf
+    previous_hash = "GENESIS"
+    last_id = 0
+    audit_nodes = {}
+
+    for entry_id, timestamp, citizen_hash, scheme, amount, prev_hash, curr_hash in rows:
+        h = sha256()
+        h.update(timestamp.encode())
+        h.update(citizen_hash.encode())
+        h.update(scheme.encode())
+        h.update(format_amount(amount).encode())
+        h.update(prev_hash.encode())
+        if h.hexdigest() != curr_hash or prev_hash != previous_hash:
+            return False
+        insert_leaf(audit_nodes, curr_hash)
+        previous_hash = curr_hash
+        last_id = entry_id
+
+    # Cross-check the incrementally maintained Merkle tree against one
+    # folded from the audited chain; a mismatch means the stored tree no
+    # longer commits to these entries.
+    if _fold_merkle_root(stored_nodes) != _fold_merkle_root(audit_nodes):
+        return False
+
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_UPDATE_LAST_VERIFIED_ID, (last_id,))
+        cursor.execute(SQL_UPDATE_LAST_VERIFIED_HASH, (previous_hash,))
+        conn.commit()
+
+    return True
+
+
+def verify_ledger_integrity():
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_SELECT_LAST_VERIFIED_ID)
+        id_row = cursor.fetchone()
+        cursor.execute(SQL_SELECT_LAST_VERIFIED_HASH)
+        hash_row = cursor.fetchone()
+        last_verified_id = int(id_row[0]) if id_row else 0
+        last_verified_hash = hash_row[0] if hash_row else "GENESIS"
+        cursor.execute(SQL_SELECT_UNVERIFIED_ROWS, (last_verified_id,))
+        rows = cursor.fetchall()
+
+    # Nothing appended since the last check: already verified.
+    if not rows:
+        return True
+
+    previous_hash = last_verified_hash
+    for row in rows:
+        entry_id, timestamp, citizen_hash, scheme, amount, prev_hash, curr_hash = row
+        amount_str = amount_hash_value(amount)
+        recalculated_hash = generate_hash(timestamp, citizen_hash, scheme, amount_str, prev_hash)
+        if recalculated_hash != curr_hash or prev_hash != previous_hash:
+            return False
+        previous_hash = curr_hash
+
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_UPDATE_LAST_VERIFIED_ID, (rows[-1][0],))
+        cursor.execute(SQL_UPDATE_LAST_VERIFIED_HASH, (previous_hash,))
+        conn.commit()
+
+    return True
+
+
+def get_system_status():
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_SELECT_STATUS)
+        row = cursor.fetchone()
+    return row[0] if row else "ACTIVE"
+
+
+def set_system_status(status):
+    with borrow_connection() as conn:
+        conn.execute(SQL_UPDATE_STATUS, (status,))
+        conn.commit()
+
+
+def calculate_remaining_budget():
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_SELECT_TOTAL_DISBURSED)
+        row = cursor.fetchone()
+    total_disbursed = float(row[0]) if row else 0.0
+    return max(INITIAL_BUDGET - total_disbursed, 0)
+
+
+# ==============================
+# CITIZEN HELPERS
+# ==============================
+
+_CITIZEN_CACHE = {}
+_CITIZEN_CACHE_LOCK = threading.Lock()
+
+
+def _invalidate_citizen_cache(citizen_id=None):
+    with _CITIZEN_CACHE_LOCK:
+        if citizen_id is None:
+            _CITIZEN_CACHE.clear()
+        else:
+            _CITIZEN_CACHE.pop(citizen_id, None)
+
+
+def prepare_citizen_record(row):
+    if not row:
+        return None
+    return {
+        "Citizen_ID": row["citizen_id"],
+        "Name": row["name"],
+        "Account_Status": row["account_status"],
+        "Aadhaar_Linked": bool(row["aadhaar_linked"]),
+        "Scheme_Eligibility": row["scheme_eligibility"],
+        "Scheme_Amount": float(row["scheme_amount"]),
+        "Claim_Count": int(row["claim_count"]),
+        "Last_Claim_Date": row["last_claim_date"],
+    }
+
+
+def get_citizen_record(citizen_id):
+    with _CITIZEN_CACHE_LOCK:
+        cached = _CITIZEN_CACHE.get(citizen_id)
+    if cached is not None:
+        return dict(cached)
+
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(SQL_SELECT_CITIZEN, (citizen_id,))
+        row = cursor.fetchone()
+    record = prepare_citizen_record(row)
+    if record is not None:
+        with _CITIZEN_CACHE_LOCK:
+            _CITIZEN_CACHE[citizen_id] = dict(record)
+    return record
+
+
+def get_expected_scheme_amount(scheme):
+    value = SCHEME_AMOUNT_MAP.get(scheme)
+    return float(value) if value is not None else None
+
+
+def get_all_citizens():
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM citizens ORDER BY name")
+        rows = cursor.fetchall()
+    return [prepare_citizen_record(row) for row in rows]
+
+
+def normalize_bool_flag(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value != 0
+    if isinstance(value, str):
+        return value.strip().lower() in {"1", "true", "yes", "y", "on"}
+    return False
+
+
+def validate_citizen_payload(data):
+    citizen_id = str(data.get("citizen_id", "")).strip()
+    if len(citizen_id) != 12 or not citizen_id.isdigit():
+        raise ValueError("Citizen ID must be a 12 digit number")
+
+    name = data.get("name", "").strip()
+    if not name:
+        raise ValueError("Name is required")
+
+    account_status = data.get("account_status", "Active").strip() or "Active"
+    aadhaar_linked = normalize_bool_flag(data.get("aadhaar_linked", False))
+    scheme = data.get("scheme_eligibility", "").strip()
+    if not scheme:
+        raise ValueError("Scheme eligibility is required")
+
+    try:
+        scheme_amount = float(data.get("scheme_amount", 0))
+    except (TypeError, ValueError):
+        raise ValueError("Scheme amount must be a number")
+    if scheme_amount <= 0:
+        raise ValueError("Scheme amount must be greater than zero")
+
+    expected_amount = get_expected_scheme_amount(scheme)
+    if expected_amount is None:
+        raise ValueError(f"Unsupported scheme: {scheme}")
+    if abs(scheme_amount - expected_amount) > AMOUNT_TOLERANCE:
+        raise ValueError(f"Scheme amount must be Rs. {expected_amount:.0f} for {scheme}")
+
+    try:
+        claim_count = int(data.get("claim_count", 0))
+    except (TypeError, ValueError):
+        raise ValueError("Claim count must be an integer")
+    if claim_count < 0:
+        raise ValueError("Claim count cannot be negative")
+
+    last_claim_date = data.get("last_claim_date") or datetime.today().strftime("%Y-%m-%d")
+    try:
+        parsed_date = datetime.strptime(str(last_claim_date), "%Y-%m-%d")
+    except ValueError:
+        raise ValueError("Last claim date must be in YYYY-MM-DD format")
+    # strptime tolerates unpadded fields ("2025-1-5"); store the
+    # re-formatted date so the frequency gate's fixed-width slicing
+    # assumption holds for every writer.
+    last_claim_date = parsed_date.strftime("%Y-%m-%d")
+
+    return {
+        "citizen_id": citizen_id,
+        "name": name,
+        "account_status": account_status,
+        "aadhaar_linked": 1 if aadhaar_linked else 0,
+        "scheme_eligibility": scheme,
+        "scheme_amount": scheme_amount,
+        "claim_count": claim_count,
+        "last_claim_date": last_claim_date,
+    }
+
+
+def upsert_citizen(record):
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """
+            INSERT INTO citizens
+            (citizen_id, name, account_status, aadhaar_linked, scheme_eligibility, scheme_amount, claim_count, last_claim_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(citizen_id) DO UPDATE SET
+                name=excluded.name,
+                account_status=excluded.account_status,
+                aadhaar_linked=excluded.aadhaar_linked,
+                scheme_eligibility=excluded.scheme_eligibility,
+                scheme_amount=excluded.scheme_amount,
+                claim_count=excluded.claim_count,
+                last_claim_date=excluded.last_claim_date
+            """,
+            (
+                record["citizen_id"],
+                record["name"],
+                record["account_status"],
+                record["aadhaar_linked"],
+                record["scheme_eligibility"],
+                record["scheme_amount"],
+                record["claim_count"],
+                record["last_claim_date"],
+            )
+        )
+        conn.commit()
+    _invalidate_citizen_cache(record["citizen_id"])
+
+
+# ==============================
+# VALIDATION GATES
+# ==============================
+
+def eligibility_gate(row, scheme, amount):
+    if row["Account_Status"] != "Active":
+        return False, "Account Not Active"
+
+    if row["Aadhaar_Linked"] is not True:
+        return False, "Aadhaar Not Linked"
+
+    if row["Scheme_Eligibility"] != scheme:
+        return False, "Scheme Not Eligible"
+
+    expected_amount = get_expected_scheme_amount(scheme)
+    if expected_amount is None:
+        return False, "Unsupported Scheme"
+
+    if abs(row["Scheme_Amount"] - expected_amount) > AMOUNT_TOLERANCE:
+        return False, "Registry Scheme Amount Mismatch"
+
+    if abs(float(amount) - expected_amount) > AMOUNT_TOLERANCE:
+        return False, "Transaction Amount Mismatch"
+
+    if row["Claim_Count"] > 3:
+        return False, "Claim Limit Exceeded"
+
+    return True, "Eligible"
+
+
+def frequency_gate(last_claim_date):
+    # The date format is fixed YYYY-MM-DD, so slice and convert directly
+    # instead of going through strptime.
+    value = str(last_claim_date)
+    try:
+        last_ord = date(int(value[0:4]), int(value[5:7]), int(value[8:10])).toordinal()
+    except ValueError:
+        return False, "Invalid last claim date"
+    diff = date.today().toordinal() - last_ord
+
+    if diff < 30:
+        return False, f"Claim within 30 days not allowed (Last claim: {diff} days ago)"
+
+    return True, "Frequency OK"
+
+
+# ==============================
+# MAIN TRANSACTION FUNCTION
+# ==============================
+
+def process_transaction(citizen_id, scheme, amount):
+    # Gates run cheapest-first so rejected requests exit before any heavy
+    # work: status, indexed citizen lookup, pure-Python checks, then the
+    # (incremental) integrity check only once a write is actually imminent.
+    status = get_system_status()
+    if status != "ACTIVE":
+        return {"success": False, "message": f"System is {status}. Transaction Blocked.", "gate": "system"}
+
+    citizen_record = get_citizen_record(citizen_id)
+    if not citizen_record:
+        return {"success": False, "message": "Citizen Not Found", "gate": "lookup"}
+
+    row = citizen_record
+    citizen_name = row.get("Name", "Unknown")
+
+    # Gate 1
+    eligible, message = eligibility_gate(row, scheme, amount)
+    if not eligible:
+        return {"success": False, "message": message, "gate": "eligibility", "citizen_name": citizen_name}
+
+    # Gate 2
+    freq_ok, message = frequency_gate(row["Last_Claim_Date"])
+    if not freq_ok:
+        return {"success": False, "message": message, "gate": "frequency", "citizen_name": citizen_name}
+
+    if not verify_ledger_integrity():
+        set_system_status("FROZEN")
+        return {"success": False, "message": "Ledger Tampering Detected. System Frozen.",
+                "gate": "integrity", "citizen_name": citizen_name}
+
+    citizen_hash = hash_id(citizen_id)
+    timestamp, claim_date = now_strings()
+
+    # Gate 3 + ledger write under a single write lock, so the budget read,
+    # previous-hash read and insert cannot interleave with another writer.
+    with borrow_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-check the status under the write lock so a concurrent
+            # freeze/lock transition cannot be missed.
+            cursor.execute(SQL_SELECT_STATUS)
+            status_row = cursor.fetchone()
+            if status_row and status_row[0] != "ACTIVE":
+                conn.rollback()
+                return {"success": False, "message": f"System is {status_row[0]}. Transaction Blocked.",
+                        "gate": "system", "citizen_name": citizen_name}
+
+            cursor.execute(SQL_SELECT_TOTAL_DISBURSED)
+            meta_row = cursor.fetchone()
+            total_disbursed = float(meta_row[0]) if meta_row else 0.0
+            remaining = max(INITIAL_BUDGET - total_disbursed, 0)
+            if remaining <= 0:
+                cursor.execute(SQL_UPDATE_STATUS, ("LOCKED",))
+                conn.commit()
+                return {"success": False, "message": "Budget Exhausted. System Locked.",
+                        "gate": "budget", "citizen_name": citizen_name}
+            if amount > remaining:
+                conn.rollback()
+                return {"success": False, "message": "Insufficient Budget",
+                        "gate": "budget", "citizen_name": citizen_name}
+
+            cursor.execute(SQL_SELECT_PREV_HASH)
+            prev_row = cursor.fetchone()
+            previous_hash = prev_row[0] if prev_row else "GENESIS"
+
+            amount_str = amount_hash_value(amount)
+            current_hash = generate_hash(timestamp, citizen_hash, scheme, amount_str, previous_hash)
+
+            cursor.execute(
+                SQL_INSERT_LEDGER,
+                (timestamp, citizen_hash, scheme, amount, previous_hash, current_hash)
+            )
+            entry_id = cursor.lastrowid
+            # Record the claim on the citizen in the same transaction as
+            # the ledger insert, so the claim count and the chain can never
+            # disagree after a crash between the two writes.
+            cursor.execute(SQL_UPDATE_CITIZEN_CLAIM, (claim_date, citizen_id))
+            cursor.execute(SQL_UPDATE_TOTAL_DISBURSED, (float(amount),))
+            _merkle_append(cursor, current_hash)
+            # The new row extends a chain verified at the top of this call,
+            # so advance the verification mark past it.
+            cursor.execute(SQL_UPDATE_LAST_VERIFIED_ID, (entry_id,))
+            cursor.execute(SQL_UPDATE_LAST_VERIFIED_HASH, (current_hash,))
+            remaining_budget = int(remaining - float(amount))
+            if remaining_budget <= 0:
+                cursor.execute(SQL_UPDATE_STATUS, ("LOCKED",))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    _invalidate_citizen_cache(citizen_id)
+
+    return {
+        "success": True,
+        "message": "Transaction Approved",
+        "citizen_name": citizen_name,
+        "remaining_budget": remaining_budget,
+        "transaction_hash": current_hash[:16] + "..."
+    }
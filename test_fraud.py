@@ -1,15 +1,123 @@
 import hashlib
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, date
+from enum import IntEnum
+import mmap
 import os
+import threading
+import time
 
 # ==============================
 # GLOBAL CONFIG
 # ==============================
 
+class Status(IntEnum):
+    ACTIVE = 0
+    FROZEN = 1
+
+
 BUDGET = 1000000
-SYSTEM_STATUS = "ACTIVE"
+_BUDGET_LOCK = threading.Lock()
+SYSTEM_STATUS = Status.ACTIVE
 LEDGER_FILE = "ledger.txt"
+REGISTRY_FILE = "jan_dhan_registry_advanced.xlsx"
+
+
+# ==============================
+# REGISTRY CACHE
+# ==============================
+
+# Schemes are categorical-encoded so the gates compare small ints instead
+# of strings. Unknown schemes get a fresh code that matches no row.
+_SCHEME_CODES = {}
+
+
+def _scheme_code(scheme):
+    return _SCHEME_CODES.setdefault(scheme, len(_SCHEME_CODES))
+
+
+class CitizenRow:
+    # Fixed C slots instead of a per-row dict: gate reads are LOAD_ATTR on
+    # a slot, and each record is a fraction of the dict's footprint. The
+    # enum-like fields are stored pre-decoded (bool flags, int scheme code)
+    # so the gates never compare strings.
+    __slots__ = ("citizen_id", "name", "account_active", "aadhaar_linked",
+                 "scheme_code", "scheme_amount", "claim_count",
+                 "last_claim_ord")
+
+    def __init__(self, citizen_id, name, account_active, aadhaar_linked,
+                 scheme_code, scheme_amount, claim_count, last_claim_ord):
+        self.citizen_id = citizen_id
+        self.name = name
+        self.account_active = account_active
+        self.aadhaar_linked = aadhaar_linked
+        self.scheme_code = scheme_code
+        self.scheme_amount = scheme_amount
+        self.claim_count = claim_count
+        self.last_claim_ord = last_claim_ord
+
+
+def load_registry():
+    df = pd.read_excel(REGISTRY_FILE)
+
+    # Convert Citizen_ID to string for lookups
+    df["Citizen_ID"] = df["Citizen_ID"].astype(str)
+
+    records = {}
+    for row in df.itertuples(index=False):
+        records[row.Citizen_ID] = CitizenRow(
+            row.Citizen_ID,
+            row.Name,
+            row.Account_Status == "Active",
+            bool(row.Aadhaar_Linked),
+            _scheme_code(row.Scheme_Eligibility),
+            int(row.Scheme_Amount),
+            int(row.Claim_Count),
+            # Ordinal so the frequency check is integer arithmetic instead
+            # of a strptime per transaction.
+            datetime.fromisoformat(str(row.Last_Claim_Date)).toordinal(),
+        )
+    return records
+
+
+# Parse the registry once at import; per-transaction lookups are O(1) dict
+# probes instead of a fresh read_excel + linear scan.
+_REGISTRY = load_registry()
+
+
+def _build_columns(registry):
+    # Columnar (SoA) copies of the eligibility fields, aligned with the
+    # positions in _ROW_INDEX, so a batch gate is a handful of fused NumPy
+    # compares rather than five Python dict probes per row.
+    ids = list(registry)
+    index = {cid: i for i, cid in enumerate(ids)}
+    columns = {
+        "status_active": np.array([registry[c].account_active for c in ids], dtype=np.bool_),
+        "aadhaar": np.array([registry[c].aadhaar_linked for c in ids], dtype=np.bool_),
+        "scheme_code": np.array([registry[c].scheme_code for c in ids], dtype=np.int16),
+        "scheme_amount": np.array([registry[c].scheme_amount for c in ids], dtype=np.int32),
+        "claim_count": np.array([registry[c].claim_count for c in ids], dtype=np.int8),
+        "last_claim_ord": np.array([registry[c].last_claim_ord for c in ids], dtype=np.int32),
+    }
+    return index, columns
+
+
+_ROW_INDEX, _COLUMNS = _build_columns(_REGISTRY)
+
+# SHA-256 of each citizen ID is a fixed mapping; compute it once here so
+# the hot path never hashes the ID again. The encoded forms feed straight
+# into generate_hash without a per-transaction .encode().
+_CITIZEN_HASH = {cid: hashlib.sha256(cid.encode()).hexdigest() for cid in _REGISTRY}
+_CITIZEN_HASH_BYTES = {cid: h.encode() for cid, h in _CITIZEN_HASH.items()}
+
+
+_SCHEME_BYTES = {}
+
+
+def _scheme_bytes(scheme):
+    # Scheme names are a small fixed set; encode each once.
+    return _SCHEME_BYTES.setdefault(scheme, scheme.encode())
 
 
 # ==============================
@@ -21,42 +129,149 @@ def hash_id(citizen_id):
 
 
 def generate_hash(timestamp, citizen_hash, scheme, amount, previous_hash):
-    record = f"{timestamp}{citizen_hash}{scheme}{amount}{previous_hash}"
-    return hashlib.sha256(record.encode()).hexdigest()
+    # Join the fields as bytes and make a single hashlib call instead of
+    # formatting an intermediate f-string; hash fields may be passed as
+    # str or as already-encoded bytes.
+    buf = b"".join((
+        timestamp.encode(),
+        citizen_hash if isinstance(citizen_hash, bytes) else citizen_hash.encode(),
+        scheme if isinstance(scheme, bytes) else scheme.encode(),
+        str(amount).encode(),
+        previous_hash if isinstance(previous_hash, bytes) else previous_hash.encode(),
+    ))
+    return hashlib.sha256(buf).hexdigest()
+
+
+# Keep one append-mode handle open for the life of the process instead of
+# paying open/close syscalls per transaction. Set LEDGER_FSYNC to force the
+# data to disk on every append.
+LEDGER_FSYNC = False
+_LEDGER_FH = None
+
+
+def _ledger_file():
+    global _LEDGER_FH
+    if _LEDGER_FH is None or _LEDGER_FH.closed:
+        _LEDGER_FH = open(LEDGER_FILE, "ab")
+    return _LEDGER_FH
+
+
+def append_ledger_line(line):
+    fh = _ledger_file()
+    fh.write(line.encode())
+    fh.flush()
+    if LEDGER_FSYNC:
+        os.fsync(fh.fileno())
+
+
+# Formatted timestamp for the current second; transactions within the same
+# wall-second share one strftime (ordering comes from previous_hash).
+_TS_CACHE = [0, ""]
+
+
+def now_string():
+    second = int(time.time())
+    if second != _TS_CACHE[0]:
+        _TS_CACHE[0] = second
+        _TS_CACHE[1] = datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S")
+    return _TS_CACHE[1]
+
+
+# Tail hash of the ledger, kept in memory after the first read and updated
+# on every successful append.
+_LAST_HASH = None
 
 
 def get_previous_hash():
+    global _LAST_HASH
+    if _LAST_HASH is not None:
+        return _LAST_HASH
+
     if not os.path.exists(LEDGER_FILE):
         return "GENESIS"
 
-    with open(LEDGER_FILE, "r") as f:
-        lines = f.readlines()
-        if not lines:
+    # Only the final line matters: read the last few hundred bytes instead
+    # of the whole file.
+    with open(LEDGER_FILE, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
             return "GENESIS"
-        last_line = lines[-1].strip().split("|")
-        return last_line[-1]  # current hash of last record
-
-
-def verify_ledger_integrity():
-    if not os.path.exists(LEDGER_FILE):
-        return True
+        f.seek(max(size - 512, 0))
+        tail = f.read()
 
-    with open(LEDGER_FILE, "r") as f:
-        lines = f.readlines()
+    lines = [line for line in tail.split(b"\n") if line.strip()]
+    if not lines:
+        return "GENESIS"
 
-    previous_hash = "GENESIS"
+    _LAST_HASH = lines[-1].strip().rsplit(b"|", 1)[-1].decode()  # current hash of last record
+    return _LAST_HASH
 
-    for line in lines:
-        timestamp, citizen_hash, scheme, amount, prev_hash, curr_hash = line.strip().split("|")
 
-        recalculated_hash = generate_hash(timestamp, citizen_hash, scheme, amount, prev_hash)
+# High-water mark of the verified prefix: byte size covered so far, the
+# chain hash at that point, and the (mtime, size) of the last result so an
+# unchanged ledger is answered without touching the file contents.
+_VERIFY_STATE = {"mtime": None, "size": 0, "tail_hash": "GENESIS", "ok": True}
 
-        if recalculated_hash != curr_hash:
-            return False
 
-        previous_hash = curr_hash
+def verify_ledger_integrity():
+    if not os.path.exists(LEDGER_FILE):
+        return True
 
-    return True
+    stat = os.stat(LEDGER_FILE)
+    state = _VERIFY_STATE
+    if (stat.st_mtime_ns, stat.st_size) == (state["mtime"], state["size"]):
+        return state["ok"]
+
+    # A shrunk file means the verified prefix was rewritten out-of-band;
+    # start over from the beginning. Otherwise only the appended tail is
+    # checked, seeded with the cached chain hash, so steady-state cost is
+    # proportional to the new records rather than the whole ledger.
+    if stat.st_size < state["size"]:
+        state["size"] = 0
+        state["tail_hash"] = "GENESIS"
+    start = state["size"]
+
+    sha256 = hashlib.sha256
+    tail_hash = state["tail_hash"].encode()
+    ok = True
+
+    # Map the file read-only instead of copying it into one big bytes
+    # object; only the line being checked is materialized.
+    if stat.st_size > start:
+        with open(LEDGER_FILE, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        try:
+            pos, end = start, len(mm)
+            while pos < end:
+                newline = mm.find(b"\n", pos)
+                if newline == -1:
+                    newline = end
+                line = mm[pos:newline].strip()
+                pos = newline + 1
+                if not line:
+                    continue
+                # The hashed preimage is the line minus its final field and
+                # the separators, so one rpartition + replace per record
+                # replaces the six-way split and re-concatenation.
+                body, _, curr_hash = line.rpartition(b"|")
+
+                if (body.rpartition(b"|")[2] != tail_hash
+                        or sha256(body.replace(b"|", b"")).hexdigest().encode() != curr_hash):
+                    ok = False
+                    break
+                tail_hash = curr_hash
+        finally:
+            mm.close()
+
+    if ok:
+        state["size"] = stat.st_size
+        state["tail_hash"] = tail_hash.decode()
+    state["mtime"] = stat.st_mtime_ns
+    state["ok"] = ok
+    return ok
 
 
 # ==============================
@@ -64,41 +279,83 @@ def verify_ledger_integrity():
 # ==============================
 
 def eligibility_gate(row, scheme, amount):
-    if row["Account_Status"] != "Active":
+    if not row.account_active:
         return False, "Account Not Active"
 
-    if row["Aadhaar_Linked"] != True:
+    if not row.aadhaar_linked:
         return False, "Aadhaar Not Linked"
 
-    if row["Scheme_Eligibility"] != scheme:
+    if row.scheme_code != _scheme_code(scheme):
         return False, "Scheme Not Eligible"
 
-    if row["Scheme_Amount"] != amount:
+    if row.scheme_amount != amount:
         return False, "Invalid Scheme Amount"
 
-    if row["Claim_Count"] > 3:
+    if row.claim_count > 3:
         return False, "Claim Limit Exceeded"
 
     return True, "Eligible"
 
 
-def frequency_gate(last_claim_date):
-    last_date = datetime.strptime(str(last_claim_date), "%Y-%m-%d")
-    today = datetime.today()
-    diff = (today - last_date).days
+# One bit per failed check, in the scalar gate's order; _REASONS[mask]
+# decodes a mask to the message of its lowest set bit, so batch rejects
+# report the same reason the serial gates would.
+_REASON_MESSAGES = (
+    "Account Not Active",
+    "Aadhaar Not Linked",
+    "Scheme Not Eligible",
+    "Invalid Scheme Amount",
+    "Claim Limit Exceeded",
+    "Claim within 30 days not allowed",
+)
+
+_REASONS = [None] * 64
+for _mask in range(1, 64):
+    _REASONS[_mask] = _REASON_MESSAGES[(_mask & -_mask).bit_length() - 1]
+
+
+def reason_batch(idx, scheme_codes, amounts):
+    # Evaluate every check unconditionally and OR the failures into a
+    # uint8 mask per row — one branch on mask == 0 downstream instead of
+    # a branchy return-early chain per transaction.
+    c = _COLUMNS
+    return ((~c["status_active"][idx]).astype(np.uint8)
+            | ((~c["aadhaar"][idx]).astype(np.uint8) << 1)
+            | ((c["scheme_code"][idx] != scheme_codes).astype(np.uint8) << 2)
+            | ((c["scheme_amount"][idx] != amounts).astype(np.uint8) << 3)
+            | ((c["claim_count"][idx] > 3).astype(np.uint8) << 4)
+            | (((today_ord() - c["last_claim_ord"][idx]) < 30).astype(np.uint8) << 5))
+
+
+# Today's ordinal, refreshed at most once a second; date.today() allocates
+# a fresh object per call.
+_TODAY_CACHE = [0, 0.0]
+
 
-    if diff < 30:
+def today_ord():
+    now = time.time()
+    if now - _TODAY_CACHE[1] > 1.0:
+        _TODAY_CACHE[0] = date.today().toordinal()
+        _TODAY_CACHE[1] = now
+    return _TODAY_CACHE[0]
+
+
+def frequency_gate(last_claim_ord):
+    if today_ord() - last_claim_ord < 30:
         return False, "Claim within 30 days not allowed"
 
     return True, "Frequency OK"
 
 
 def budget_gate(amount):
+    # Check and debit under one lock so concurrent workers cannot both
+    # pass the check and overdraw; a bare `BUDGET -= amount` is not atomic.
     global BUDGET
-    if amount > BUDGET:
-        return False, "Insufficient Budget"
+    with _BUDGET_LOCK:
+        if amount > BUDGET:
+            return False, "Insufficient Budget"
 
-    BUDGET -= amount
+        BUDGET -= amount
     return True, "Budget Approved"
 
 
@@ -107,35 +364,28 @@ def budget_gate(amount):
 # ==============================
 
 def process_transaction(citizen_id, scheme, amount):
-    global SYSTEM_STATUS
+    global SYSTEM_STATUS, _LAST_HASH
 
-    if SYSTEM_STATUS != "ACTIVE":
-        return f"System is {SYSTEM_STATUS}. Transaction Blocked."
+    if SYSTEM_STATUS is not Status.ACTIVE:
+        return f"System is {SYSTEM_STATUS.name}. Transaction Blocked."
 
     # Verify ledger integrity before processing
     if not verify_ledger_integrity():
-        SYSTEM_STATUS = "FROZEN"
+        SYSTEM_STATUS = Status.FROZEN
         return "Ledger Tampering Detected. System Frozen."
 
-    df = pd.read_excel("jan_dhan_registry_advanced.xlsx")
-    
-    # Convert Citizen_ID to string for comparison
-    df["Citizen_ID"] = df["Citizen_ID"].astype(str)
-
-    citizen_row = df[df["Citizen_ID"] == citizen_id]
+    row = _REGISTRY.get(citizen_id)
 
-    if citizen_row.empty:
+    if row is None:
         return "Citizen Not Found"
 
-    row = citizen_row.iloc[0]
-
     # Gate 1
     eligible, message = eligibility_gate(row, scheme, amount)
     if not eligible:
         return message
 
     # Gate 2
-    freq_ok, message = frequency_gate(row["Last_Claim_Date"])
+    freq_ok, message = frequency_gate(row.last_claim_ord)
     if not freq_ok:
         return message
 
@@ -145,18 +395,58 @@ def process_transaction(citizen_id, scheme, amount):
         return message
 
     # If all gates pass → Write to ledger
-    citizen_hash = hash_id(citizen_id)
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    citizen_hash = _CITIZEN_HASH[citizen_id]
+    timestamp = now_string()
     previous_hash = get_previous_hash()
 
-    current_hash = generate_hash(timestamp, citizen_hash, scheme, amount, previous_hash)
+    current_hash = generate_hash(timestamp, _CITIZEN_HASH_BYTES[citizen_id],
+                                 _scheme_bytes(scheme), amount, previous_hash)
 
-    with open(LEDGER_FILE, "a") as f:
-        f.write(f"{timestamp}|{citizen_hash}|{scheme}|{amount}|{previous_hash}|{current_hash}\n")
+    append_ledger_line(f"{timestamp}|{citizen_hash}|{scheme}|{amount}|{previous_hash}|{current_hash}\n")
+    _LAST_HASH = current_hash
 
     return f"Transaction Approved | Remaining Budget: Rs.{BUDGET}"
 
 
+def _amount_lane(amounts):
+    # float64 keeps fractional amounts intact (so 5000.5 is rejected, as
+    # in the scalar gate) and does not overflow on large ints; anything
+    # unconvertible becomes -1.0, which matches no scheme amount, so one
+    # bad value rejects its own row instead of crashing the batch.
+    lane = np.empty(len(amounts), dtype=np.float64)
+    for i, amount in enumerate(amounts):
+        try:
+            lane[i] = amount
+        except (TypeError, ValueError, OverflowError):
+            lane[i] = -1.0
+    return lane
+
+
+def process_batch(citizen_ids, schemes, amounts):
+    # Vectorized front gate for TPS-style batches: reject ineligible rows
+    # with one pass over the registry columns, then run only the survivors
+    # through the sequential ledger path (the hash chain is inherently
+    # serial).
+    idx = np.array([_ROW_INDEX.get(cid, -1) for cid in citizen_ids], dtype=np.int64)
+    codes = np.array([_scheme_code(s) for s in schemes], dtype=np.int16)
+    amount_arr = _amount_lane(amounts)
+
+    known = idx >= 0
+    reason = np.zeros(len(idx), dtype=np.uint8)
+    reason[known] = reason_batch(idx[known], codes[known], amount_arr[known])
+
+    results = []
+    for i, citizen_id in enumerate(citizen_ids):
+        if not known[i]:
+            results.append("Citizen Not Found")
+        elif reason[i]:
+            results.append(_REASONS[reason[i]])
+        else:
+            # The budget debit and ledger append stay serial.
+            results.append(process_transaction(citizen_id, schemes[i], amounts[i]))
+    return results
+
+
 # ==============================
 # TEST RUN
 # ==============================